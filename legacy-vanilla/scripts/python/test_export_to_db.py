@@ -0,0 +1,198 @@
+"""
+test_export_to_db.py — export_to_db 의 upsert / collector / 트랜잭션을 로컬 SQLite(:memory:)로 검증
+
+Postgres 경로(%s 플레이스홀더, 다중 행 ON CONFLICT 의 rowcount)는
+AIRLENS_TEST_PG_URL 이 설정된 경우에만 실행 (테스트용 빈 DB 사용)
+
+Usage:
+  python3 -m pytest legacy-vanilla/scripts/python/test_export_to_db.py
+  AIRLENS_TEST_PG_URL=postgresql://localhost/airlens_test python3 -m pytest ...
+"""
+
+import os, json, sqlite3, sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import export_to_db as ex
+
+NOW1 = "2026-01-01T00:00:00Z"
+NOW2 = "2026-01-02T00:00:00Z"
+
+
+def make_db():
+    conn = sqlite3.connect(":memory:")
+    cur = conn.cursor()
+    ex.create_tables(cur)
+    return conn, cur
+
+
+def daily_rows(n, avg=10.0):
+    return [
+        {"sensor_id": 1 + i // 1000, "date": f"day-{i % 1000:04d}",
+         "city": "Seoul", "country": "KR", "avg": avg}
+        for i in range(n)
+    ]
+
+
+def test_insert_then_identical_rerun_then_single_change():
+    conn, cur = make_db()
+    rows = daily_rows(20000)
+
+    assert ex.upsert_rows(cur, "pm25_daily", rows, "?", 999, NOW1) == (20000, 0)
+    assert cur.execute("SELECT COUNT(*) FROM pm25_daily").fetchone()[0] == 20000
+
+    # 동일 데이터 재적재 → 변경 0, updated_at 유지
+    assert ex.upsert_rows(cur, "pm25_daily", rows, "?", 999, NOW2) == (0, 0)
+    assert cur.execute("SELECT DISTINCT updated_at FROM pm25_daily").fetchall() == [(NOW1,)]
+
+    rows[5]["avg"] = 99.0
+    assert ex.upsert_rows(cur, "pm25_daily", rows, "?", 999, NOW2) == (1, 0)
+    assert cur.execute(
+        "SELECT avg, updated_at FROM pm25_daily WHERE sensor_id = 1 AND date = 'day-0005'"
+    ).fetchone() == (99.0, NOW2)
+    assert cur.execute("SELECT COUNT(*) FROM pm25_daily WHERE updated_at = ?", (NOW2,)).fetchone()[0] == 1
+
+
+def test_duplicate_key_last_row_wins():
+    conn, cur = make_db()
+    rows = [
+        {"sensor_id": 7, "location_id": 1, "city": "New York", "country": "US"},
+        {"sensor_id": 7, "location_id": 2, "city": "New York", "country": "US"},
+    ]
+    assert ex.upsert_rows(cur, "stations", rows, "?", 999, NOW1) == (1, 0)
+    assert cur.execute("SELECT location_id FROM stations").fetchall() == [(2,)]
+
+
+def test_missing_key_rows_are_skipped():
+    conn, cur = make_db()
+    rows = daily_rows(3)
+    rows[0]["date"] = ""
+    rows[1]["sensor_id"] = None
+    assert ex.upsert_rows(cur, "pm25_daily", rows, "?", 999, NOW1) == (1, 2)
+    assert cur.execute("SELECT COUNT(*) FROM pm25_daily").fetchone()[0] == 1
+
+
+def test_rows_split_across_batches():
+    conn, cur = make_db()
+    inserts = []
+    conn.set_trace_callback(lambda sql: inserts.append(sql) if sql.startswith("INSERT") else None)
+
+    ncols = len(ex.TABLES["pm25_daily"][0]) + 2  # + row_hash, updated_at
+    max_vars = 10 * ncols                          # 배치당 10행
+    assert ex.upsert_rows(cur, "pm25_daily", daily_rows(25), "?", max_vars, NOW1) == (25, 0)
+    assert len(inserts) == 3
+    assert cur.execute("SELECT COUNT(*) FROM pm25_daily").fetchone()[0] == 25
+
+
+
+def write_json(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(data), encoding="utf-8")
+
+
+@pytest.fixture
+def data_dirs(tmp_path, monkeypatch):
+    """public/data 와 레거시 app/data 를 tmp_path 로 교체"""
+    data, legacy = tmp_path / "public" / "data", tmp_path / "legacy"
+    monkeypatch.setattr(ex, "ROOT", tmp_path)
+    monkeypatch.setattr(ex, "DATA_DIR", data)
+    monkeypatch.setattr(ex, "LEGACY_DATA_DIR", legacy)
+
+    write_json(data / "openaq" / "stations.json", {"stations": [
+        {"city": "Seoul", "country": "KR", "location_id": 10, "sensor_id": 1},
+    ]})
+    write_json(data / "openaq" / "pm25_days.json", {"data": [
+        {"city": "Seoul", "country": "KR", "sensor_id": 1, "data": [
+            {"date": "2026-01-01", "avg": 20.5}, {"date": "2026-01-02", "avg": 18.0},
+        ]},
+    ]})
+    # build_policy_effect 형식: dataFile 이 DATA_DIR 기준 경로, impact + policyInfo
+    write_json(data / "index.json", {"countries": [
+        {"countryCode": "KR", "region": "East Asia", "dataFile": "policy-impact/kr.json"},
+        {"countryCode": "CN", "region": "East Asia", "dataFile": "cn.json"},
+    ]})
+    write_json(data / "policy-impact" / "kr.json", {
+        "countryCode": "KR", "region": "East Asia",
+        "policyInfo": {"name": "Clean Air Action Plan", "implementationDate": "2019"},
+        "impact": {
+            "analysis": {"deltaMean": -4.3, "percentChange": -15.1, "pValue": 0.05, "significant": False},
+            "beforePeriod": {"meanPM25": 28.5}, "afterPeriod": {"meanPM25": 24.2},
+        },
+    })
+    # 정적 상세 파일 형식: dataFile 이 policy-impact/ 기준 (fallback 경로), policies[]
+    write_json(data / "policy-impact" / "cn.json", {
+        "countryCode": "CN", "region": "East Asia",
+        "policies": [
+            {"name": "Action Plan", "implementationDate": "2013-09-10", "impact": {
+                "analysis": {"deltaMean": -30.1, "percentChange": -33.3,
+                             "pValue": 0.000123456789, "significant": True},
+                "beforePeriod": {"meanPM25": 90.2}, "afterPeriod": {"meanPM25": 60.1},
+            }},
+            {"name": "No Impact Yet", "implementationDate": "2025-01-01"},
+        ],
+    })
+    # data_quality.json 은 레거시 app/data 에만 존재
+    write_json(legacy / "data_quality.json", {"stations": [
+        {"station_id": "demo_seoul_01", "final_score": 100.0, "badge": "High"},
+    ]})
+    return data
+
+
+def test_export_all_collects_both_policy_formats_and_legacy_quality(data_dirs):
+    conn = sqlite3.connect(":memory:")
+    stats = ex.export_all(conn, "?", ex.SQLITE_MAX_VARS)
+
+    assert stats["stations"] == (1, 1, 0)
+    assert stats["pm25_daily"] == (2, 2, 0)
+    assert stats["pm25_annual"] == (0, 0, 0)
+    assert stats["aod_samples"] == (0, 0, 0)
+    assert stats["data_quality"] == (1, 1, 0)
+    assert stats["policy_effects"] == (2, 2, 0)
+
+    rows = conn.execute(
+        "SELECT country_code, policy_name, implementation_date, region, delta_mean, "
+        "percent_change, p_value, significant, before_mean, after_mean, impact "
+        "FROM policy_effects ORDER BY country_code"
+    ).fetchall()
+    assert [r[:10] for r in rows] == [
+        ("CN", "Action Plan", "2013-09-10", "East Asia", -30.1, -33.3, 0.000123456789, 1, 90.2, 60.1),
+        ("KR", "Clean Air Action Plan", "2019", "East Asia", -4.3, -15.1, 0.05, 0, 28.5, 24.2),
+    ]
+    assert json.loads(rows[1][10])["analysis"]["deltaMean"] == -4.3
+    assert conn.execute("SELECT station_id, final_score FROM data_quality").fetchall() == [("demo_seoul_01", 100.0)]
+
+    types = {r[1]: r[2] for r in conn.execute("PRAGMA table_info(aod_samples)")}
+    assert types["lat"] == types["aod_annual_avg"] == "DOUBLE PRECISION"
+
+
+def test_export_all_rolls_back_every_table_on_failure(data_dirs, monkeypatch):
+    def broken():
+        raise RuntimeError("collector failed")
+    monkeypatch.setitem(ex.COLLECTORS, "aod_samples", broken)
+
+    conn = sqlite3.connect(":memory:")
+    with pytest.raises(RuntimeError):
+        ex.export_all(conn, "?", ex.SQLITE_MAX_VARS)
+
+    for table in ("stations", "pm25_daily", "pm25_annual"):
+        assert conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] == 0
+
+
+@pytest.mark.skipif(not os.environ.get("AIRLENS_TEST_PG_URL") or ex.psycopg2 is None,
+                    reason="AIRLENS_TEST_PG_URL / psycopg2 not available")
+def test_postgres_upsert_roundtrip():
+    conn, ph, max_vars = ex.connect(os.environ["AIRLENS_TEST_PG_URL"])
+    try:
+        cur = conn.cursor()
+        cur.execute("DROP TABLE IF EXISTS pm25_daily")
+        ex.create_tables(cur)
+        rows = daily_rows(2000) + daily_rows(1)  # 첫 행 키 중복
+        assert ex.upsert_rows(cur, "pm25_daily", rows, ph, 999, NOW1) == (2000, 0)
+        assert ex.upsert_rows(cur, "pm25_daily", rows, ph, 999, NOW2) == (0, 0)
+        rows[5]["avg"] = 99.0
+        assert ex.upsert_rows(cur, "pm25_daily", rows, ph, 999, NOW2) == (1, 0)
+    finally:
+        conn.rollback()
+        conn.close()